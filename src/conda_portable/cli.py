@@ -1,21 +1,53 @@
 import argparse
+import glob
+import subprocess
 import sys
 from pathlib import Path
-from .transform import make_portable, run_conda_lock
+from .transform import make_portable, make_portable_many, run_conda_lock
 
 def main():
     # Example usage:
     # conda-portable --env environment.yml --from_platform Windows
+    # conda-portable --batch "envs/**/*.yml" --from_platform Windows
 
     ap = argparse.ArgumentParser(
         description="Make a Conda environment.yml portable across platforms and verify with conda-lock"
     )
-    ap.add_argument("--env", required=True, help="Path to environment.yml")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--env", help="Path to environment.yml")
+    src.add_argument("--batch", metavar="GLOB",
+                     help="Glob of environment files to convert in parallel (quote it to stop the shell expanding it)")
     ap.add_argument("--from_platform", default="Windows",
                     choices=["Windows", "Linux", "MacOS"],
                     help="Platform the environment.yml was exported from")
     args = ap.parse_args()
 
+    if args.batch:
+        # only regular env files; skip everything this tool writes (outputs, hash sidecars, lockfiles)
+        inputs = [Path(p) for p in sorted(glob.glob(args.batch, recursive=True))
+                  if Path(p).is_file() and Path(p).suffix in (".yml", ".yaml")
+                  and not p.endswith((".portable.yml", "conda-lock.yml"))]
+        if not inputs:
+            print(f"ERROR: no environment files match {args.batch}", file=sys.stderr)
+            sys.exit(1)
+        done, failed = make_portable_many(inputs, from_platform=args.from_platform)
+        for outp in done: # -> one line per file, printed here so parallel workers don't interleave
+            print(f"✅ {outp} (from {args.from_platform})")
+        for path, err in failed: # -> report conversion failures before locking the rest
+            print(f"ERROR: {path}: {err}", file=sys.stderr)
+        lock_failed = []
+        for outp in done:
+            # one lockfile per environment so they don't overwrite each other
+            lockfile = outp.with_name(outp.name[:-len(".portable.yml")] + ".conda-lock.yml")
+            try:
+                run_conda_lock(outp, lockfile=lockfile)
+            except subprocess.CalledProcessError as e: # -> keep locking the other files
+                print(f"ERROR: {outp}: conda-lock exited with status {e.returncode}", file=sys.stderr)
+                lock_failed.append(outp)
+        if failed or lock_failed:
+            sys.exit(1)
+        return
+
     inp = Path(args.env)
     if not inp.exists():
         print(f"ERROR: {inp} not found", file=sys.stderr)
@@ -1,7 +1,45 @@
 import yaml
+import functools
+import hashlib
 import importlib.resources as resources
 import subprocess
+import shutil
+import sys
 import pathlib
+import re
+
+# prefer the libyaml-backed C loader/dumper, fall back to the pure-Python safe ones
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+class Dumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    """Safe dumper configured once for all environment files (nulls are written as empty values)."""
+
+Dumper.add_representer(type(None), lambda dumper, _: dumper.represent_scalar("tag:yaml.org,2002:null", ""))
+
+# first environment marker, extras bracket or version operator ends the package name
+_SEP = r"[;\[]|===|==|>=|<=|!=|~=|[=<>]"
+_SEP_RE = re.compile(_SEP)
+# lookahead that must follow a package name for a prefix match to count as the whole name:
+# optional whitespace, then the end of the spec or one of the same separators base_name cuts at
+_NAME_END = r"(?=\s*(?:$|" + _SEP + "))"
+
+def _name_matcher(names) -> re.Pattern:
+    """Compile a single case-insensitive regex matching specs whose base name is in `names`.
+
+    Args:
+        names (Iterable[str]): Package names to match.
+
+    Returns:
+        re.Pattern: Pattern whose `.match(spec)` is truthy iff base_name(spec) is one of `names` (ignoring case).
+    """
+    names = sorted(names, key=len, reverse=True) # -> longest first so "mkl-service" is tried before backtracking to "mkl"
+    if not names:
+        return re.compile(r"(?!)") # -> never matches
+    return re.compile(r"^\s*(?:" + "|".join(map(re.escape, names)) + ")" + _NAME_END, re.I)
+
+# Windows specific packages for math/ linear algebra -> these are not needed on Linux/MacOS and can cause issues
+_MKL_NAMES = frozenset({"mkl", "mkl-service", "intel-openmp", "openmp"})
+_LIBBLAS_RE = _name_matcher(("libblas",))
 
 def base_name(spec: str) -> str:
     """Extract the base name from a package specification.
@@ -12,45 +50,54 @@ def base_name(spec: str) -> str:
     Returns:
         str:    Base name of the package, lowercased and stripped of version and platform info.
     """
-    spec = spec.split(";", 1)[0].strip()
-    spec = spec.split("[", 1)[0]
-    for sep in ("===", "==", ">=", "<=", "!=", "~=", "=", ">", "<"):
-        if sep in spec:
-            spec = spec.split(sep, 1)[0]
-            break
+    m = _SEP_RE.search(spec) # -> single scan for the first marker/extras/operator
+    if m:
+        spec = spec[:m.start()]
     return spec.strip().lower()
 
-def _strip_mkl_and_pin_openblas(dep_list: list) -> list:
-    """
-    Remove MKL/OpenMP deps and enforce OpenBLAS for portability.
-    Drops: {"mkl", "mkl-service", "intel-openmp", "openmp"}.
-    Ensures 'libblas=*=*openblas' is present.
-    """
-    drop_names = {"mkl", "mkl-service", "intel-openmp", "openmp"} # Windows specific packages for math/ linear algebra
-    # -> these are not needed on Linux/MacOS and can cause issues
-    kept, has_openblas = [], False
-
-    for d in dep_list:
-        if isinstance(d, str):
-            name = base_name(d) # collect base name of the dependency
-            if name in drop_names: # -> check if it is a package to drop
-                continue
-            if name == "libblas" and "*openblas" in d: # -> check the dependency list it already has OpenBLAS as a dependency
-                has_openblas = True
-        kept.append(d) # -> keep the dependency if not a string (like the pip section) 
-    # -> if OpenBLAS is not in the list, add it to the top -> this makes conda opt for OpenBLAS instead of MKL which helps with portability on Linux/MacOS
-    if not has_openblas: 
-        kept.insert(0, "libblas=*=*openblas")
-    return kept
-
+@functools.lru_cache(maxsize=1)
 def _load_common_packages() -> dict:
     """Load common packages configuration from the common_packages YAML file.
+    The file ships with the package, so it is parsed once and cached; callers must not mutate the result.
 
     Returns:
         dict: A dictionary containing common packages for different platforms.
     """
-    with resources.files("conda_portable").joinpath("common_packages.yaml").open("r", encoding="utf-8") as f:
-        return yaml.safe_load(f)
+    with resources.files("conda_portable").joinpath("common_packages.yaml").open("rb") as f:
+        return yaml.load(f, Loader=Loader)
+
+@functools.lru_cache(maxsize=1)
+def _rules_digest() -> bytes:
+    """Digest of everything besides the input file that decides the portable output.
+    Covers the packaged common_packages.yaml and this module's own source, so editing either invalidates cached outputs.
+
+    Returns:
+        bytes: blake2b digest of the transform rules.
+    """
+    h = hashlib.blake2b()
+    h.update(resources.files("conda_portable").joinpath("common_packages.yaml").read_bytes())
+    h.update(pathlib.Path(__file__).read_bytes())
+    return h.digest()
+
+def _hash_path(outp: pathlib.Path) -> pathlib.Path:
+    """Sidecar file holding the input hash that `outp` was last written from, followed by the hash of `outp` itself."""
+    return outp.with_name(outp.name + ".hash")
+
+def _is_up_to_date(outp: pathlib.Path, hash_file: pathlib.Path, digest: str) -> bool:
+    """Check that `outp` was written from an input with `digest` and has not been edited or truncated since.
+
+    Args:
+        outp (Path): Path to the portable environment file.
+        hash_file (Path): Its sidecar hash file.
+        digest (str): Hash of the current input, platform and rules.
+
+    Returns:
+        bool: True if `outp` can be reused as-is.
+    """
+    if not (outp.exists() and hash_file.exists()):
+        return False
+    recorded = hash_file.read_text(encoding="utf-8").split()
+    return recorded == [digest, hashlib.blake2b(outp.read_bytes()).hexdigest()]
 
 def _print_box(msg: str):
     """
@@ -60,9 +107,7 @@ def _print_box(msg: str):
         msg (str): The message to print inside the box.
     """
     border = "*" * (len(msg) + 4)
-    print(border)
-    print(f"* {msg} *")
-    print(border)
+    sys.stdout.write(f"{border}\n* {msg} *\n{border}\n") # -> one write instead of three print calls
 
 def _tag_pip_packages(dependency_dict:dict, drop_platform_specific_pip: set, from_platform: str) -> str:
     """ Drop platform-specific pip packages and tag them with the platform.
@@ -75,17 +120,18 @@ def _tag_pip_packages(dependency_dict:dict, drop_platform_specific_pip: set, fro
     Returns:
         str: pip package name with the platform tag.
     """
-    tagged_packages = []
-    for p in dependency_dict.get("pip") or []: # -> get the pip dict or fall back to empty list
-                # ->1. check if package is string, 2. base_name is contained common pip packages and 3. is not already marked"
-                if isinstance(p, str) and base_name(p) in drop_platform_specific_pip and ";" not in p: 
-                    p = f'{p} ; platform_system == "{from_platform}"' # mark pip packages with platform tag 
-                tagged_packages.append(p) # -> append the package to the list
-                
+    pip_re = _name_matcher(drop_platform_specific_pip) # -> one prefix matcher over all platform-specific names
+    marker = f' ; platform_system == "{from_platform}"'
+    # ->1. check if package is string, 2. is not already marked and 3. base_name is contained common pip packages
+    # -> then mark pip packages with platform tag; the comprehension skips the per-item .append lookup
+    tagged_packages = [
+        p + marker if isinstance(p, str) and ";" not in p and pip_re.match(p) else p
+        for p in dependency_dict.get("pip") or [] # -> get the pip dict or fall back to empty list
+    ]
     return tagged_packages
     
 
-def make_portable(inp: pathlib.Path, outp: pathlib.Path, from_platform: str = "Windows") -> None:
+def make_portable(inp: pathlib.Path, outp: pathlib.Path, from_platform: str = "Windows", *, verbose: bool = True) -> None:
     """
     Convert a conda environment file to a portable format by adjusting dependencies
     based on the specified platform. For ex, specifying "Windows" will
@@ -96,14 +142,25 @@ def make_portable(inp: pathlib.Path, outp: pathlib.Path, from_platform: str = "W
         inp (Path): Path to the input environment file.
         outp (Path):   Path to the output environment now portable) file.
         from_platform (str, optional): The platform from which the base environment is made. Defaults to "Windows".
+        verbose (bool, optional): Print the status banner and result line. Batch runs turn this off and report per file instead. Defaults to True.
 
 
     """
     # display status of pipeline
-    _print_box("Making environment portable")
+    if verbose:
+        _print_box("Making environment portable")
+
+    # skip all YAML work if outp was already written from the same input, platform and rules and is untouched since
+    raw = inp.read_bytes()
+    digest = hashlib.blake2b(raw + _rules_digest() + from_platform.encode()).hexdigest()
+    hash_file = _hash_path(outp)
+    if _is_up_to_date(outp, hash_file, digest):
+        if verbose:
+            print(f"✅ {outp} is up to date (from {from_platform})")
+        return
 
     # load yaml file containig packages
-    data = yaml.safe_load(inp.read_text(encoding="utf-8"))
+    data = yaml.load(raw, Loader=Loader)  # -> hand raw bytes to the parser, no intermediate str
     if not isinstance(data, dict) or "dependencies" not in data:
         raise SystemExit("ERROR: no 'dependencies' in environment file")
 
@@ -119,51 +176,129 @@ def make_portable(inp: pathlib.Path, outp: pathlib.Path, from_platform: str = "W
     # define sets for conda and pip packages to drop according to the platform
     drop_platform_specific_conda = set(x.lower() for x in package_specific_platform.get("conda", []))
     drop_platform_specific_pip   = set(x.lower() for x in package_specific_platform.get("pip", []))
+    # -> MKL/OpenMP deps are dropped in the same pass so OpenBLAS can be enforced for portability
+    drop_conda_re = _name_matcher(drop_platform_specific_conda | _MKL_NAMES) # -> one compiled matcher instead of base_name + set per item
 
     # get all dependencies from the environment file
     deps = data.get("dependencies", [])
-    new_deps, pip_section = [], None
+    # -> split the pip dictionary off up front so the conda loop only sees (almost always) strings
+    pip_items = [d for d in deps if isinstance(d, dict) and "pip" in d]
+    conda_items = [d for d in deps if not (isinstance(d, dict) and "pip" in d)]
+    new_deps, has_openblas = [], False
 
-    for item in deps:
-        if isinstance(item, dict) and "pip" in item: # -> look for pip dictionary inside the dependency list
-            tagged_packages = _tag_pip_packages(item, drop_platform_specific_pip, from_platform)
-            pip_section = {"pip": tagged_packages}
-            continue
-        if isinstance(item, str):  # -> go through str entries in the conda dependency list before pip
-            if base_name(item) in drop_platform_specific_conda:  # -> ignore conda packages that are platform specific
+    for item in conda_items:
+        try:
+            if drop_conda_re.match(item):  # -> ignore conda packages that are platform specific
                 continue
-            new_deps.append(item)  # -> keep valid conda dependency
-        else:
+        except TypeError:
             # -> any other structure (rare in practice), just preserve as-is
             new_deps.append(item)
+            continue
+        if "*openblas" in item and _LIBBLAS_RE.match(item): # -> check the dependency list it already has OpenBLAS as a dependency
+            has_openblas = True
+        new_deps.append(item)  # -> keep valid conda dependency
 
-    if pip_section:
-        new_deps.append(pip_section)
+    if pip_items: # -> look for pip dictionary inside the dependency list (the last one wins)
+        tagged_packages = _tag_pip_packages(pip_items[-1], drop_platform_specific_pip, from_platform)
+        new_deps.append({"pip": tagged_packages})
 
-    # ensure OpenBLAS is used and MKL/OpenMP packages are removed
-    new_deps = _strip_mkl_and_pin_openblas(new_deps)
+    # -> if OpenBLAS is not in the list, add it to the top -> this makes conda opt for OpenBLAS instead of MKL which helps with portability on Linux/MacOS
+    if not has_openblas:
+        new_deps.insert(0, "libblas=*=*openblas")
 
     # write the modified environment file
     data["dependencies"] = new_deps
-    outp.write_text(yaml.safe_dump(data, sort_keys=False), encoding="utf-8")
-    print(f"✅ wrote {outp} (from {from_platform})")
+    with outp.open("wb") as f:  # -> emit straight into the file instead of building a string
+        yaml.dump(data, f, Dumper=Dumper, sort_keys=False, default_flow_style=False,
+                  allow_unicode=True, encoding="utf-8")
+    hash_file.write_text(f"{digest}\n{hashlib.blake2b(outp.read_bytes()).hexdigest()}\n", encoding="utf-8")
+    if verbose:
+        print(f"✅ wrote {outp} (from {from_platform})")
+
+_CONDA_LOCK_MISSING = "ERROR: conda-lock not found. Install with: pip install conda-lock"
+
+@functools.lru_cache(maxsize=1)
+def _conda_lock_exe():
+    """Locate the conda-lock executable on PATH once per session.
+
+    Returns:
+        str | None: Full path to conda-lock, or None if it is not installed.
+    """
+    return shutil.which("conda-lock")
+
+def _portable_path(inp: pathlib.Path) -> pathlib.Path:
+    """Output path for `inp` in batch mode, e.g. envs/ml.yml -> envs/ml.portable.yml."""
+    return inp.with_name(inp.stem + ".portable.yml")
+
+def _make_portable_worker(inp: pathlib.Path, from_platform: str) -> tuple:
+    """Process pool entry point: convert one file next to itself, quietly (the caller reports the results).
 
-def run_conda_lock(env_file: pathlib.Path, *, platforms=None) -> None:
-    """Create a multi-platform conda-lock.yml from env_file."""
+    Returns:
+        tuple: (output path, error message or None), so one bad file doesn't abort the whole batch.
+    """
+    outp = _portable_path(inp)
+    try:
+        make_portable(inp, outp, from_platform=from_platform, verbose=False)
+    except SystemExit as e: # -> make_portable reports bad input files this way
+        return outp, str(e).removeprefix("ERROR: ")
+    except Exception as e:
+        return outp, f"{type(e).__name__}: {e}"
+    return outp, None
+
+def make_portable_many(inputs: list, from_platform: str = "Windows", max_workers: int = None) -> tuple:
+    """
+    Convert several conda environment files in parallel, one process per file.
+    Each input is written next to itself as `<stem>.portable.yml`.
+
+    Args:
+        inputs (list[Path]): Paths to the input environment files.
+        from_platform (str, optional): The platform from which the environments were exported. Defaults to "Windows".
+        max_workers (int, optional): Size of the process pool. Defaults to the number of CPUs.
+
+    Returns:
+        tuple[list[Path], list[tuple[Path, str]]]: Output paths of the converted files (in input order),
+            and (input path, error message) for every file that failed.
+    """
+    inputs = [pathlib.Path(p) for p in inputs]
+
+    # -> two inputs writing the same output (a.yml + a.yaml, or the same file listed twice) would race and silently overwrite
+    seen = {}
+    for inp in inputs:
+        outp = _portable_path(inp).resolve()
+        if outp in seen:
+            raise SystemExit(f"ERROR: {seen[outp]} and {inp} would both be written to {outp}")
+        seen[outp] = inp
+
+    if len(inputs) <= 1: # -> not worth spinning up a pool
+        results = [_make_portable_worker(p, from_platform) for p in inputs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor # -> only batch runs pay for the pool imports
+        with ProcessPoolExecutor(max_workers=max_workers) as ex:
+            results = list(ex.map(_make_portable_worker, inputs, [from_platform] * len(inputs)))
+
+    done = [outp for outp, err in results if err is None]
+    failed = [(inp, err) for inp, (_, err) in zip(inputs, results) if err is not None]
+    return done, failed
+
+def run_conda_lock(env_file: pathlib.Path, *, platforms=None, lockfile: pathlib.Path = None) -> None:
+    """Create a multi-platform conda-lock.yml (or `lockfile`, if given) from env_file."""
     if platforms is None:
         platforms = ["win-64", "osx-arm64", "linux-64"]
 
-    # ensure conda-lock is available
-    try:
-        subprocess.run(["conda-lock", "--version"], check=True,
-                        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except Exception:
-        raise SystemExit("ERROR: conda-lock not found. Install with: pip install conda-lock")
+    # ensure conda-lock is available -> a PATH lookup instead of spawning `conda-lock --version`
+    exe = _conda_lock_exe()
+    if exe is None:
+        raise SystemExit(_CONDA_LOCK_MISSING)
 
     _print_box("Verifying portable environment with conda-lock")
     cmd = ["conda-lock", "lock", "--mamba", "--file", str(env_file)]
     for p in platforms:
         cmd += ["--platform", p]
+    if lockfile is not None:
+        cmd += ["--lockfile", str(lockfile)]
     print("+", " ".join(cmd))
-    subprocess.run(cmd, check=True)
-    print("✅ wrote conda-lock.yml")
+    try:
+        subprocess.run([exe] + cmd[1:], check=True)
+    except FileNotFoundError: # -> executable vanished after the lookup was cached
+        raise SystemExit(_CONDA_LOCK_MISSING)
+    print(f"✅ wrote {lockfile or 'conda-lock.yml'}")